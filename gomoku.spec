@@ -5,7 +5,7 @@ a = Analysis(
     ['gomoku_ai\\gui.py'],
     pathex=[],
     binaries=[],
-    datas=[('gomoku_ai/board.py', '.'), ('gomoku_ai/minimax.py', '.'), ('gomoku_ai/gui.py', '.')],
+    datas=[('gomoku_ai/board.py', '.'), ('gomoku_ai/minimax.py', '.'), ('gomoku_ai/search_common.py', '.'), ('gomoku_ai/gui.py', '.')],
     hiddenimports=[],
     hookspath=[],
     hooksconfig={},
@@ -1,5 +1,8 @@
 import pygame
+import numpy as np
 import sys
+import threading
+import multiprocessing
 from board import Board
 from minimax import GomokuAI
 import time
@@ -49,8 +52,12 @@ class GomokuGUI:
         self.window_size = self.cell_size * (self.board_size - 1) + self.margin * 2
         self.info_height = 60
         self.screen = pygame.display.set_mode((self.window_size, self.window_size + self.info_height))
+        self.info_rect = pygame.Rect(0, self.window_size, self.window_size, self.info_height)
         pygame.display.set_caption("Gomoku")
         
+        # Regions of the window that changed since the last frame
+        self.dirty_rects = [self.screen.get_rect()]
+        
         # Game state
         self.board = Board()
         self.ai = GomokuAI(max_depth=4)
@@ -60,6 +67,20 @@ class GomokuGUI:
         self.player_color = 1
         self.selecting_color = True
         
+        # AI search runs in a daemon thread so the window stays responsive
+        # and closing the window doesn't wait for a search to finish
+        self.ai_thread = None
+        self.ai_result = []
+        self.ai_start_time = 0
+        
+        # Pre-rendered empty board
+        self.background = self.create_background()
+        
+        # Pre-rendered stone sprites, blitted in one batch per frame
+        self.stone_radius = self.cell_size // 2 - 2
+        self.stone_sprites = {1: self.create_stone_sprite(BLACK),
+                              -1: self.create_stone_sprite(WHITE, outline=BLACK)}
+        
         # Font settings
         self.font = pygame.font.Font(None, 36)
         self.small_font = pygame.font.Font(None, 24)
@@ -91,31 +112,16 @@ class GomokuGUI:
 
     def draw_board(self):
         """Draw the game board"""
-        self.screen.fill(BROWN)
-        
-        # Draw grid lines
-        for i in range(self.board_size):
-            pygame.draw.line(self.screen, BLACK,
-                           (self.margin, self.margin + i * self.cell_size),
-                           (self.window_size - self.margin, self.margin + i * self.cell_size))
-            pygame.draw.line(self.screen, BLACK,
-                           (self.margin + i * self.cell_size, self.margin),
-                           (self.margin + i * self.cell_size, self.window_size - self.margin))
+        self.screen.blit(self.background, (0, 0))
         
         # Draw pieces
-        for i in range(self.board_size):
-            for j in range(self.board_size):
-                if self.board.board[i][j] != 0:
-                    color = BLACK if self.board.board[i][j] == 1 else WHITE
-                    pos = (self.margin + j * self.cell_size,
-                          self.margin + i * self.cell_size)
-                    pygame.draw.circle(self.screen, color, pos, self.cell_size // 2 - 2)
-                    if self.board.board[i][j] == -1:
-                        pygame.draw.circle(self.screen, BLACK, pos, self.cell_size // 2 - 2, 1)
+        offset = self.margin - self.stone_radius - 1
+        self.screen.blits([(self.stone_sprites[self.board.board[i][j]],
+                            (offset + j * self.cell_size, offset + i * self.cell_size))
+                           for i, j in zip(*np.nonzero(self.board.board))], False)
         
         # Draw info area
-        info_rect = pygame.Rect(0, self.window_size, self.window_size, self.info_height)
-        pygame.draw.rect(self.screen, WHITE, info_rect)
+        pygame.draw.rect(self.screen, WHITE, self.info_rect)
         
         if self.selecting_color:
             self.draw_color_selection()
@@ -142,7 +148,51 @@ class GomokuGUI:
                 turn_rect = turn_text.get_rect(center=(self.window_size // 2, self.window_size + 45))
                 self.screen.blit(turn_text, turn_rect)
         
-        pygame.display.flip()
+        pygame.display.update(self.dirty_rects)
+        self.dirty_rects = []
+
+    def mark_dirty(self, rect=None):
+        """Schedule a region for the next redraw, the whole window by default"""
+        self.dirty_rects.append(rect if rect is not None else self.screen.get_rect())
+
+    def set_message(self, message):
+        """Update the info message"""
+        self.message = message
+        self.mark_dirty(self.info_rect)
+
+    def place_stone(self, move):
+        """Make a move on the board and schedule the changed regions"""
+        self.board.make_move(move)
+        i, j = move
+        offset = self.margin - self.stone_radius - 1
+        size = self.stone_radius * 2 + 2
+        self.mark_dirty(pygame.Rect(offset + j * self.cell_size, offset + i * self.cell_size, size, size))
+        self.mark_dirty(self.info_rect)
+
+    def create_background(self):
+        """Render the empty board and grid once"""
+        background = pygame.Surface((self.window_size, self.window_size))
+        background.fill(BROWN)
+        
+        # Draw grid lines
+        for i in range(self.board_size):
+            pygame.draw.line(background, BLACK,
+                           (self.margin, self.margin + i * self.cell_size),
+                           (self.window_size - self.margin, self.margin + i * self.cell_size))
+            pygame.draw.line(background, BLACK,
+                           (self.margin + i * self.cell_size, self.margin),
+                           (self.margin + i * self.cell_size, self.window_size - self.margin))
+        return background.convert()
+
+    def create_stone_sprite(self, color, outline=None):
+        """Render a single stone onto a transparent surface"""
+        size = self.stone_radius * 2 + 2
+        center = (self.stone_radius + 1, self.stone_radius + 1)
+        sprite = pygame.Surface((size, size), pygame.SRCALPHA)
+        pygame.draw.circle(sprite, color, center, self.stone_radius)
+        if outline is not None:
+            pygame.draw.circle(sprite, outline, center, self.stone_radius, 1)
+        return sprite.convert_alpha()
 
     def draw_color_selection(self):
         """Draw color selection screen"""
@@ -179,17 +229,26 @@ class GomokuGUI:
                     pygame.quit()
                     sys.exit()
                 
+                # The window may have lost its contents while covered or minimised
+                if event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED, pygame.WINDOWRESTORED):
+                    self.mark_dirty()
+                
                 if self.selecting_color:
-                    self.black_button.handle_event(event)
-                    self.white_button.handle_event(event)
+                    for button in (self.black_button, self.white_button):
+                        was_hovered = button.is_hovered
+                        button.handle_event(event)
+                        if button.is_hovered != was_hovered:
+                            self.mark_dirty(button.rect)
                     
                     if event.type == pygame.MOUSEBUTTONDOWN:
                         if self.black_button.is_hovered:
                             self.player_color = 1
                             self.selecting_color = False
+                            self.mark_dirty()
                         elif self.white_button.is_hovered:
                             self.player_color = -1
                             self.selecting_color = False
+                            self.mark_dirty()
                             self.ai_move()
                 else:
                     if event.type == pygame.MOUSEBUTTONDOWN:
@@ -201,27 +260,45 @@ class GomokuGUI:
                             board_pos = self.get_board_pos(mouse_pos)
                             
                             if board_pos and self.board.is_valid_move(board_pos):
-                                self.board.make_move(board_pos)
+                                self.place_stone(board_pos)
                                 self.check_game_state()
                                 
                                 if not self.game_over:
                                     self.ai_move()
             
-            self.draw_board()
+            if self.ai_thread is not None:
+                self.poll_ai()
+            
+            if self.dirty_rects:
+                self.draw_board()
             pygame.time.wait(50)
 
     def ai_move(self):
-        """AI makes a move"""
-        self.message = "AI thinking..."
-        self.draw_board()
-        
-        start_time = time.time()
-        ai_move = self.ai.get_move(self.board)
-        end_time = time.time()
+        """Start the AI search in the background"""
+        self.set_message("AI thinking")
+        self.ai_start_time = time.time()
+        self.ai_result = []
+        self.ai_thread = threading.Thread(target=self.search,
+                                          args=(self.board.copy(), self.ai_result), daemon=True)
+        self.ai_thread.start()
+
+    def search(self, board, result):
+        """Run in the AI thread: store the chosen move in result"""
+        result.append(self.ai.get_move(board))
+
+    def poll_ai(self):
+        """Apply the AI move once the search finishes, animate the message meanwhile"""
+        if self.ai_thread.is_alive():
+            dots = "." * (int((time.time() - self.ai_start_time) * 3) % 4)
+            if self.message != "AI thinking" + dots:
+                self.set_message("AI thinking" + dots)
+            return
         
+        ai_move = self.ai_result[0] if self.ai_result else None
+        self.ai_thread = None
         if ai_move:
-            self.board.make_move(ai_move)
-            self.message = f"AI move time: {end_time - start_time:.1f}s"
+            self.place_stone(ai_move)
+            self.set_message(f"AI move time: {time.time() - self.ai_start_time:.1f}s")
             self.check_game_state()
 
     def check_game_state(self):
@@ -231,10 +308,10 @@ class GomokuGUI:
             self.game_over = True
             self.winner = winner
             win_text = "Black" if winner == 1 else "White"
-            self.message = f"{win_text} wins!"
+            self.set_message(f"{win_text} wins!")
         elif len(self.board.get_valid_moves()) == 0:
             self.game_over = True
-            self.message = "Draw!"
+            self.set_message("Draw!")
 
     def reset_game(self):
         """Reset the game"""
@@ -242,9 +319,13 @@ class GomokuGUI:
         self.game_over = False
         self.winner = 0
         self.message = ""
+        self.ai_thread = None
+        self.mark_dirty()
         if self.player_color == -1 and not self.selecting_color:
             self.ai_move()
 
 if __name__ == "__main__":
+    # Needed by the frozen exe when the AI searches with worker processes
+    multiprocessing.freeze_support()
     game = GomokuGUI()
     game.run()
@@ -1,17 +1,195 @@
 import math
 import random
+import time
 import numpy as np
 from board import Board
+from search_common import (TT_MASK, EXACT, LOWER, UPPER, SearchTables, njit,
+                           zobrist_hash, zobrist_update)
 
-class Node:
-    def __init__(self, board, parent=None, move=None):
-        self.board = board
-        self.parent = parent
-        self.move = move
-        self.children = []
-        self.wins = 0
-        self.visits = 0
-        self.untried_moves = self._get_sorted_moves(board)
+DIRECTIONS = ((1, 0), (0, 1), (1, 1), (1, -1))
+WIN_SCORE = 1000000
+
+# 线棋型分数缓存：线的内容 -> {玩家: 每个位置的分数}
+LINE_CACHE_SIZE = 1 << 16
+_line_cache = {}
+
+@njit(cache=True, boundscheck=False)
+def _longest_line(board_array, i, j, player):
+    """把(i, j)视为player的棋子时，经过该点的最长连子数（不修改棋盘）"""
+    size = board_array.shape[0]
+    longest = 0
+    for di, dj in DIRECTIONS:
+        count = 1
+        # 正向检查
+        ni, nj = i + di, j + dj
+        while 0 <= ni < size and 0 <= nj < size and board_array[ni, nj] == player:
+            count += 1
+            ni += di
+            nj += dj
+        
+        # 反向检查
+        ni, nj = i - di, j - dj
+        while 0 <= ni < size and 0 <= nj < size and board_array[ni, nj] == player:
+            count += 1
+            ni -= di
+            nj -= dj
+        
+        longest = max(longest, count)
+    return longest
+
+@njit(cache=True, boundscheck=False)
+def _makes_five(board_array, i, j, player):
+    """把(i, j)视为player的棋子时是否形成连五（不修改棋盘）"""
+    return _longest_line(board_array, i, j, player) >= 5
+
+@njit(cache=True, boundscheck=False)
+def _threat_runs(board_array):
+    """每个空位分别落下黑/白棋后形成的最长连子数（封顶为5），有棋子的位置为0"""
+    size = board_array.shape[0]
+    runs = np.zeros((2, size, size), dtype=np.int64)
+    for i in range(size):
+        for j in range(size):
+            if board_array[i, j] == 0:
+                runs[0, i, j] = min(_longest_line(board_array, i, j, 1), 5)
+                runs[1, i, j] = min(_longest_line(board_array, i, j, -1), 5)
+    return runs
+
+@njit(cache=True, boundscheck=False)
+def _update_threat_runs(board_array, runs, i, j):
+    """(i, j)落子后更新_threat_runs的结果，只需重算经过该点的四条线上前后5格内的空位"""
+    size = board_array.shape[0]
+    runs[0, i, j] = 0
+    runs[1, i, j] = 0
+    for di, dj in DIRECTIONS:
+        for t in range(-5, 6):
+            ni, nj = i + t * di, j + t * dj
+            if t != 0 and 0 <= ni < size and 0 <= nj < size and board_array[ni, nj] == 0:
+                runs[0, ni, nj] = min(_longest_line(board_array, ni, nj, 1), 5)
+                runs[1, ni, nj] = min(_longest_line(board_array, ni, nj, -1), 5)
+
+# 以下按方向特化的取线函数返回经过(i, j)的整条线，以及(i, j)在线上的下标
+def _column_through(board_array, i, j):
+    return board_array[:, j], i
+
+def _row_through(board_array, i, j):
+    return board_array[i], j
+
+def _diagonal_through(board_array, i, j):
+    return board_array.diagonal(j - i), min(i, j)
+
+def _anti_diagonal_through(board_array, i, j):
+    flipped_j = board_array.shape[1] - 1 - j
+    return board_array[:, ::-1].diagonal(flipped_j - i), min(i, flipped_j)
+
+LINE_GETTERS = {
+    (1, 0): _column_through,
+    (0, 1): _row_through,
+    (1, 1): _diagonal_through,
+    (1, -1): _anti_diagonal_through,
+}
+
+@njit(cache=True, boundscheck=False)
+def _pattern_score(consecutive, blocked):
+    """根据连子数和被堵端数返回棋型分数"""
+    if consecutive >= 5:
+        return 100000  # 连五
+    elif consecutive == 4:
+        if blocked == 0:
+            return 50000  # 活四
+        elif blocked == 1:
+            return 10000  # 冲四
+    elif consecutive == 3:
+        if blocked == 0:
+            return 8000  # 活三
+        elif blocked == 1:
+            return 3000  # 眠三
+    elif consecutive == 2:
+        if blocked == 0:
+            return 1000  # 活二
+        elif blocked == 1:
+            return 300  # 眠二
+    
+    return 100  # 基础分
+
+@njit(cache=True, boundscheck=False)
+def _scan_line(cells, player):
+    """从线上每个位置向两侧扫描，返回各位置的棋型分数"""
+    length = cells.shape[0]
+    scores = np.empty(length, dtype=np.int64)
+    for k in range(length):
+        consecutive = 1
+        blocked = 0
+        for step in (-1, 1):
+            space = 0
+            n = k + step
+            while 0 <= n < length:
+                if cells[n] == 0:
+                    space += 1
+                    if space >= 2:
+                        break
+                elif cells[n] == player:
+                    if space == 0:
+                        consecutive += 1
+                    else:
+                        break
+                else:
+                    blocked += 1
+                    break
+                n += step
+        scores[k] = _pattern_score(consecutive, blocked)
+    return scores
+
+# 棋型分数表：PATTERN_SCORES[min(连子数, 5), 被堵端数]
+PATTERN_SCORES = np.array([[_pattern_score(consecutive, blocked) for blocked in range(3)]
+                           for consecutive in range(6)], dtype=np.float64)
+
+# 计算连子长度时在棋盘四周填充的宽度与填充值（既不是空位也不是任何一方的棋子）
+RUN_PAD = 16
+EDGE = 2
+
+def _run_lengths(stones, di, dj):
+    """stones为某一方棋子的布尔数组，返回从每个位置开始沿(di, dj)方向的连子长度"""
+    runs = stones.astype(np.int64)
+    while True:
+        # 填充足够宽，np.roll绕回的只会是填充区域
+        extended = stones * (1 + np.roll(runs, (-di, -dj), axis=(0, 1)))
+        if np.array_equal(extended, runs):
+            return runs
+        runs = extended
+
+# 曼哈顿距离2以内的邻域（含中心）
+NEIGHBOR_KERNEL = np.array([[abs(dx) + abs(dy) <= 2 for dy in range(-2, 3)] for dx in range(-2, 3)])
+
+def _neighbor_mask(board_array):
+    """返回与任一棋子曼哈顿距离不超过2的位置"""
+    size = board_array.shape[0]
+    occupied = np.pad(board_array != 0, 2)
+    mask = np.zeros((size, size), dtype=bool)
+    for dx, dy in np.argwhere(NEIGHBOR_KERNEL):
+        mask |= occupied[dx:dx + size, dy:dy + size]
+    return mask
+
+def _mark_neighbors(mask, i, j):
+    """落子(i, j)后把其邻域加入掩码"""
+    size = mask.shape[0]
+    top, left = max(0, i - 2), max(0, j - 2)
+    mask[top:i + 3, left:j + 3] |= NEIGHBOR_KERNEL[top - i + 2:size - i + 2, left - j + 2:size - j + 2]
+
+def _line_scores(line):
+    """一条线上每个位置对双方的棋型分数，以线的内容为键缓存；
+    某条线只在其上有落子时内容才会变化，其余线的结果可直接复用"""
+    key = line.tobytes()
+    scores = _line_cache.get(key)
+    if scores is None:
+        if len(_line_cache) >= LINE_CACHE_SIZE:
+            _line_cache.clear()
+        cells = np.ascontiguousarray(line)
+        scores = {player: _scan_line(cells, player).tolist() for player in (1, -1)}
+        _line_cache[key] = scores
+    return scores
+
+class MoveEvaluator:
+    """着法评估工具，供MCTS节点与Alpha-Beta搜索共用"""
 
     def _get_sorted_moves(self, board):
         """获取排序后的移动列表，优先考虑关键位置"""
@@ -24,23 +202,27 @@ class Node:
             center = board.size // 2
             return [(center, center)]
         
+        # 只考虑已有棋子附近的位置
+        near = _neighbor_mask(np.asarray(board.board))
+        valid_moves = [move for move in valid_moves if near[move]]
+        
         # 检查必胜/必防位置
         critical_moves = []
         high_priority_moves = []
         normal_moves = []
+        scores, wins, threats = self._evaluate_moves(board, valid_moves)
         
-        for move in valid_moves:
+        for move, score, win, threat in zip(valid_moves, scores.tolist(), wins, threats):
             # 检查是否能赢
-            if self._is_winning_move(board, move, board.current_player):
+            if win:
                 return [move]  # 立即返回必胜着法
             
             # 检查是否需要防守
-            if self._is_winning_move(board, move, -board.current_player):
+            if threat:
                 critical_moves.append(move)
                 continue
             
             # 评估移动的价值
-            score = self._evaluate_move(board, move)
             if score >= 5000:  # 高优先级移动（形成活三或以上）
                 high_priority_moves.append((score, move))
             else:
@@ -59,156 +241,86 @@ class Node:
         sorted_moves.extend([move for _, move in normal_moves])
         return sorted_moves[:10]
 
+    def _play_move(self, board, move):
+        """在棋盘上直接落子并交换执子方，不做合法性检查"""
+        board.board[move[0]][move[1]] = board.current_player
+        board.current_player = -board.current_player
+
+    def _undo_move(self, board, move):
+        """撤销_play_move的落子"""
+        board.board[move[0]][move[1]] = 0
+        board.current_player = -board.current_player
+
     def _is_winning_move(self, board, move, player):
         """检查是否是必胜着法"""
-        test_board = board.copy()
-        test_board.board[move[0]][move[1]] = player
-        
-        # 检查四个方向
-        directions = [(1,0), (0,1), (1,1), (1,-1)]
-        for di, dj in directions:
-            count = 1
-            # 正向检查
-            ni, nj = move[0] + di, move[1] + dj
-            while 0 <= ni < board.size and 0 <= nj < board.size and test_board.board[ni][nj] == player:
-                count += 1
-                ni += di
-                nj += dj
-            
-            # 反向检查
-            ni, nj = move[0] - di, move[1] - dj
-            while 0 <= ni < board.size and 0 <= nj < board.size and test_board.board[ni][nj] == player:
-                count += 1
-                ni -= di
-                nj -= dj
-            
-            if count >= 5:
-                return True
-        return False
+        return _makes_five(np.asarray(board.board), move[0], move[1], player)
 
-    def _evaluate_move(self, board, move):
-        """评估移动的价值"""
-        i, j = move
-        score = 0
+    def _evaluate_moves(self, board, moves):
+        """一次性评估所有候选移动，返回(分数, 能否成五, 对手能否成五)三个数组"""
         player = board.current_player
         opponent = -player
+        board_array = np.asarray(board.board)
+        padded = np.pad(board_array, RUN_PAD, constant_values=EDGE)
+        rows = np.array([move[0] for move in moves])
+        cols = np.array([move[1] for move in moves])
+        I, J = rows + RUN_PAD, cols + RUN_PAD
         
-        # 在移动位置模拟落子
-        test_board = board.copy()
-        test_board.board[i][j] = player
-        
-        # 评估四个方向
-        directions = [(1,0), (0,1), (1,1), (1,-1)]
-        for di, dj in directions:
-            # 评估进攻
-            attack_score = self._evaluate_line(test_board, i, j, di, dj, player)
-            score += attack_score
-            
-            # 评估防守
-            defense_score = self._evaluate_line(board, i, j, di, dj, opponent)
-            score += defense_score * 1.1  # 略微提高防守权重
+        score = np.zeros(len(moves))
+        fives = {}
+        for di, dj in DIRECTIONS:
+            line_scores = {}
+            for color in (player, opponent):
+                stones = padded == color
+                consecutive = np.ones(len(moves), dtype=np.int64)
+                blocked = np.zeros(len(moves), dtype=np.int64)
+                # 向两侧统计紧邻的连子，再看连子之后的一到两格是否被对手堵住
+                for step in (1, -1):
+                    runs = _run_lengths(stones, step * di, step * dj)
+                    run = runs[I + step * di, J + step * dj]
+                    consecutive += run
+                    after = padded[I + step * di * (run + 1), J + step * dj * (run + 1)]
+                    beyond = padded[I + step * di * (run + 2), J + step * dj * (run + 2)]
+                    blocked += (after == -color) | ((after == 0) & (beyond == -color))
+                line_scores[color] = PATTERN_SCORES[np.minimum(consecutive, 5), blocked]
+                fives[color] = fives.get(color, False) | (consecutive >= 5)
+            # 评估进攻，评估防守（略微提高防守权重）
+            score += line_scores[player]
+            score += line_scores[opponent] * 1.1
         
         # 考虑位置的中心性
         center = board.size // 2
-        distance_to_center = abs(i - center) + abs(j - center)
-        score -= distance_to_center * 10
-        
-        # 考虑与最近棋子的距离
-        min_distance = self._get_min_distance_to_pieces(board, move)
-        if min_distance > 2:  # 如果离最近的棋子太远，大幅降低分数
-            score *= 0.1
+        score -= (np.abs(rows - center) + np.abs(cols - center)) * 10
         
-        return score
+        return score, fives[player], fives[opponent]
 
-    def _evaluate_line(self, board, i, j, di, dj, player):
-        """评估某个方向的棋型"""
-        consecutive = 1
-        space_before = 0
-        space_after = 0
-        blocked = 0
-        
-        # 向前检查
-        ni, nj = i - di, j - dj
-        while 0 <= ni < board.size and 0 <= nj < board.size:
-            if board.board[ni][nj] == 0:
-                space_before += 1
-                if space_before >= 2:
-                    break
-            elif board.board[ni][nj] == player:
-                if space_before == 0:
-                    consecutive += 1
-                else:
-                    break
-            else:
-                blocked += 1
-                break
-            ni -= di
-            nj -= dj
-        
-        # 向后检查
-        ni, nj = i + di, j + dj
-        while 0 <= ni < board.size and 0 <= nj < board.size:
-            if board.board[ni][nj] == 0:
-                space_after += 1
-                if space_after >= 2:
-                    break
-            elif board.board[ni][nj] == player:
-                if space_after == 0:
-                    consecutive += 1
-                else:
-                    break
-            else:
-                blocked += 1
-                break
-            ni += di
-            nj += dj
-        
-        # 评分规则
-        if consecutive >= 5:
-            return 100000  # 连五
-        elif consecutive == 4:
-            if blocked == 0:
-                return 50000  # 活四
-            elif blocked == 1:
-                return 10000  # 冲四
-        elif consecutive == 3:
-            if blocked == 0:
-                return 8000  # 活三
-            elif blocked == 1:
-                return 3000  # 眠三
-        elif consecutive == 2:
-            if blocked == 0:
-                return 1000  # 活二
-            elif blocked == 1:
-                return 300  # 眠二
-        
-        return 100  # 基础分
-
-    def _get_min_distance_to_pieces(self, board, move):
-        """计算到最近棋子的距离"""
-        min_distance = float('inf')
-        i, j = move
-        
-        for x in range(max(0, i-2), min(board.size, i+3)):
-            for y in range(max(0, j-2), min(board.size, j+3)):
-                if board.board[x][y] != 0:
-                    distance = abs(x-i) + abs(y-j)
-                    min_distance = min(min_distance, distance)
-        
-        return min_distance
+class Node(MoveEvaluator):
+    def __init__(self, board, parent=None, move=None):
+        # board只在构造时读取，节点不持有棋盘，局面由根节点加移动链决定
+        self.parent = parent
+        self.move = move
+        self.player_to_move = board.current_player
+        self.children = []
+        self.wins = 0
+        self.visits = 0
+        self._log_visits = 0.0  # log(visits)，在update中维护
+        self._inv_sqrt_visits = 0.0  # 1/sqrt(visits)，在update中维护
+        self.winner = 0  # 走到该节点的一步是否已分出胜负
+        if move is not None and self._is_winning_move(board, move, -board.current_player):
+            self.winner = -board.current_player
+        self.untried_moves = self._get_sorted_moves(board)
 
     def select_child(self):
         """使用UCB1公式选择最有希望的子节点"""
         c = 1.414  # UCB1探索参数
-        s = sorted(self.children, key=lambda x: x.wins/x.visits + 
-                  c * math.sqrt(2 * math.log(self.visits)/x.visits))
-        return s[-1]
-
-    def add_child(self, move):
-        """添加子节点"""
-        new_board = self.board.copy()
-        new_board.make_move(move)
-        child = Node(new_board, self, move)
+        c_sqrt = c * math.sqrt(2 * self._log_visits)
+        # 倒序遍历，分数相同时与排序后取最后一个的结果一致
+        return max(reversed(self.children),
+                   key=lambda x: x.wins/x.visits + c_sqrt * x._inv_sqrt_visits)
+
+    def add_child(self, board, move):
+        """在当前节点的局面board上落子并添加子节点，board随之前进到子节点局面"""
+        self._play_move(board, move)
+        child = Node(board, self, move)
         self.untried_moves.remove(move)
         self.children.append(child)
         return child
@@ -217,6 +329,8 @@ class Node:
         """更新节点的统计信息"""
         self.visits += 1
         self.wins += result
+        self._log_visits = math.log(self.visits)
+        self._inv_sqrt_visits = 1 / math.sqrt(self.visits)
 
 class MCTS:
     def __init__(self, time_limit=5.0, max_moves=1000):
@@ -225,7 +339,6 @@ class MCTS:
 
     def get_move(self, board):
         """获取最佳移动"""
-        import time
         root = Node(board)
         
         # 首先检查必胜/必防着法
@@ -238,6 +351,8 @@ class MCTS:
                 return move
         
         end_time = time.time() + self.time_limit
+        # 整个搜索共用一份棋盘：沿树下降时落子，回溯时撤销
+        sim_board = board.copy()
         
         # 在时间限制内进行尽可能多的模拟
         while time.time() < end_time:
@@ -246,138 +361,248 @@ class MCTS:
             # Selection
             while node.untried_moves == [] and node.children != []:
                 node = node.select_child()
+                node._play_move(sim_board, node.move)
             
             # Expansion
-            if node.untried_moves != []:
+            if node.untried_moves != [] and node.winner == 0:
                 move = node.untried_moves[0]  # 选择最高分的移动
-                node = node.add_child(move)
+                node = node.add_child(sim_board, move)
             
             # Simulation
-            board_state = node.board.copy()
-            current_player = board_state.current_player
+            board_array = np.array(sim_board.board)
+            player = node.player_to_move
+            current_player = player
+            near = _neighbor_mask(board_array)
+            runs = _threat_runs(board_array)
+            result = node.winner
             
-            # 快速模拟
-            while not board_state.is_game_over():
-                moves = board_state.get_valid_moves()
-                if not moves:
-                    break
+            # 快速模拟：每步选择威胁最大的位置（己方成五 > 防守对方成五 > 己方连四 > ...）
+            while result == 0:
+                # 只考虑已有棋子附近的空位
+                candidates = near & (board_array == 0)
+                if not candidates.any():
+                    candidates = board_array == 0
+                    if not candidates.any():
+                        break  # 棋盘已满，和棋
                 
-                # 检查必胜/必防移动
-                winning_move = None
-                blocking_move = None
+                me = 0 if player == 1 else 1
+                priority = np.maximum(2 * runs[me] + 1, 2 * runs[1 - me])
+                i, j = np.unravel_index(np.argmax(np.where(candidates, priority, -1)), priority.shape)
+                if runs[me, i, j] >= 5:
+                    result = player
                 
-                for move in moves[:min(6, len(moves))]:
-                    # 检查是否能赢
-                    if self._is_winning_move(board_state, move):
-                        winning_move = move
-                        break
-                    # 检查是否需要防守
-                    elif self._is_winning_move(board_state, move, check_opponent=True):
-                        blocking_move = move
-                
-                if winning_move:
-                    chosen_move = winning_move
-                elif blocking_move:
-                    chosen_move = blocking_move
-                else:
-                    # 使用启发式选择移动
-                    move_scores = [(self._quick_evaluate_move(board_state, move), move) 
-                                 for move in moves[:min(6, len(moves))]]
-                    move_scores.sort(reverse=True)
-                    chosen_move = move_scores[0][1]
-                
-                board_state.make_move(chosen_move)
+                board_array[i, j] = player
+                _mark_neighbors(near, i, j)
+                _update_threat_runs(board_array, runs, i, j)
+                player = -player
             
             # Backpropagation
-            result = board_state.check_win()
             while node is not None:
                 if result == 0:
                     node.update(0.5)
                 else:
                     node.update(1 if result == current_player else 0)
+                if node.parent is not None:
+                    node._undo_move(sim_board, node.move)
                 node = node.parent
         
         # 选择访问次数最多的移动
-        return sorted(root.children, key=lambda x: x.visits)[-1].move
+        return max(reversed(root.children), key=lambda x: x.visits).move
 
-    def _is_winning_move(self, board, move, check_opponent=False):
-        """检查是否是必胜/必防移动"""
-        player = -board.current_player if check_opponent else board.current_player
-        test_board = board.copy()
-        test_board.board[move[0]][move[1]] = player
+    def get_best_move(self, board):
+        """获取最佳移动并返回相关统计信息"""
+        move = self.get_move(board)
+        return move
+
+class _SearchTimeout(Exception):
+    """搜索超时，用于从递归中途退出"""
+
+class AlphaBeta(MoveEvaluator, SearchTables):
+    def __init__(self, time_limit=5.0, max_depth=6):
+        self.time_limit = time_limit
+        self.max_depth = max_depth
+        self.end_time = 0
+        self.root_player = 1
+        self.tt = {}  # 置换表：槽位 -> (哈希, 深度, 分数, 类型, 最佳移动)
+        self.killers = {}  # 剩余深度 -> 最近两个引起剪枝的移动
+        self.pv = []  # 上一轮迭代的主要变例
+
+    def get_move(self, board):
+        """使用迭代加深的Alpha-Beta搜索获取最佳移动"""
+        moves = self._get_sorted_moves(board)
+        if not moves:
+            return None
         
-        directions = [(1,0), (0,1), (1,1), (1,-1)]
-        for di, dj in directions:
-            count = 1
-            # 正向检查
-            ni, nj = move[0] + di, move[1] + dj
-            while 0 <= ni < board.size and 0 <= nj < board.size and test_board.board[ni][nj] == player:
-                count += 1
-                ni += di
-                nj += dj
-            
-            # 反向检查
-            ni, nj = move[0] - di, move[1] - dj
-            while 0 <= ni < board.size and 0 <= nj < board.size and test_board.board[ni][nj] == player:
-                count += 1
-                ni -= di
-                nj -= dj
-            
-            if count >= 5:
-                return True
-        return False
+        # 首先检查必胜/必防着法
+        for move in moves:
+            if self._is_winning_move(board, move, board.current_player):
+                return move
+            if self._is_winning_move(board, move, -board.current_player):
+                return move
+        
+        if len(moves) == 1:
+            return moves[0]
+        
+        # 分数以根节点玩家的视角保存，执子方变化时置换表失效
+        if board.current_player != self.root_player:
+            self.tt.clear()
+        self.root_player = board.current_player
+        self.end_time = time.time() + self.time_limit
+        self.killers = {}
+        self.pv = []
+        key = zobrist_hash(board)
+        best_move = moves[0]
+        # 整个搜索在同一份棋盘上落子/撤销，超时中断时不影响调用方的棋盘
+        board = board.copy()
+        
+        # 迭代加深，超时则返回上一层搜索的结果
+        for depth in range(1, self.max_depth + 1):
+            try:
+                best_move = self._search_root(board, moves, depth, key)
+            except _SearchTimeout:
+                break
+            # 下一轮优先搜索本轮的主要变例
+            self.pv = self._principal_variation(board, key, depth)
+        
+        return best_move
 
-    def _quick_evaluate_move(self, board, move):
-        """快速评估移动的价值（用于模拟阶段）"""
-        i, j = move
-        score = 0
-        player = board.current_player
+    def _search_root(self, board, moves, depth, key):
+        """在根节点上搜索指定深度，返回最佳移动"""
+        if self.pv:
+            moves = self._order_moves(moves, self.pv[0], depth)
+        alpha = float('-inf')
+        best_score = float('-inf')
+        best_move = moves[0]
         
-        # 检查四个方向
-        directions = [(1,0), (0,1), (1,1), (1,-1)]
-        for di, dj in directions:
-            consecutive = 1
-            blocked = 0
-            space = 0
+        for move in moves:
+            child_key = self._make_move(board, move, key)
+            score = self.alphabeta(board, depth - 1, alpha, float('inf'), False, child_key)
+            self._undo_move(board, move)
             
-            # 向两个方向检查
-            for direction in [1, -1]:
-                ni, nj = i + direction * di, j + direction * dj
-                while 0 <= ni < board.size and 0 <= nj < board.size:
-                    if board.board[ni][nj] == player:
-                        if space == 0:
-                            consecutive += 1
-                        else:
-                            break
-                    elif board.board[ni][nj] == 0:
-                        space += 1
-                        if space >= 2:
-                            break
-                    else:
-                        blocked += 1
-                        break
-                    ni += direction * di
-                    nj += direction * dj
+            if score > best_score:
+                best_score = score
+                best_move = move
             
-            # 评分
-            if consecutive >= 5:
-                score += 100000
-            elif consecutive == 4:
-                if blocked == 0:
-                    score += 50000
-                elif blocked == 1:
-                    score += 10000
-            elif consecutive == 3:
-                if blocked == 0:
-                    score += 5000
-                elif blocked == 1:
-                    score += 1000
-            elif consecutive == 2:
-                if blocked == 0:
-                    score += 500
-                elif blocked == 1:
-                    score += 100
+            alpha = max(alpha, best_score)
+        
+        self._store(key, depth, best_score, EXACT, best_move)
+        return best_move
+
+    def alphabeta(self, board, depth, alpha, beta, maximizing, key):
+        """带Alpha-Beta剪枝的极大极小搜索，分数以根节点玩家的视角计算"""
+        if time.time() > self.end_time:
+            raise _SearchTimeout()
         
+        # 查询置换表
+        alpha_orig, beta_orig = alpha, beta
+        tt_move = None
+        entry = self.tt.get(key & TT_MASK)
+        if entry is not None and entry[0] == key:
+            tt_move = entry[4]
+            if entry[1] >= depth:
+                _, _, score, flag, _ = entry
+                if flag == EXACT:
+                    return score
+                if flag == LOWER:
+                    alpha = max(alpha, score)
+                else:
+                    beta = min(beta, score)
+                if alpha >= beta:
+                    return score
+        
+        if depth == 0:
+            score = self._evaluate_board(board)
+            self._store(key, depth, score, EXACT, None)
+            return score
+        
+        moves = self._get_sorted_moves(board)
+        if not moves:
+            return 0  # 棋盘已满，和棋
+        
+        # 能一步成五则当前玩家获胜，越早获胜分数越高
+        if self._is_winning_move(board, moves[0], board.current_player):
+            return WIN_SCORE + depth if maximizing else -WIN_SCORE - depth
+        
+        moves = self._order_moves(moves, tt_move, depth)
+        best_move = moves[0]
+        if maximizing:
+            value = float('-inf')
+            for move in moves:
+                child_key = self._make_move(board, move, key)
+                eval = self.alphabeta(board, depth - 1, alpha, beta, False, child_key)
+                self._undo_move(board, move)
+                if eval > value:
+                    value = eval
+                    best_move = move
+                alpha = max(alpha, eval)
+                if beta <= alpha:
+                    self._add_killer(move, depth)
+                    break
+        else:
+            value = float('inf')
+            for move in moves:
+                child_key = self._make_move(board, move, key)
+                eval = self.alphabeta(board, depth - 1, alpha, beta, True, child_key)
+                self._undo_move(board, move)
+                if eval < value:
+                    value = eval
+                    best_move = move
+                beta = min(beta, eval)
+                if beta <= alpha:
+                    self._add_killer(move, depth)
+                    break
+        
+        # 按原始窗口确定分数类型并写入置换表
+        if value <= alpha_orig:
+            flag = UPPER
+        elif value >= beta_orig:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self._store(key, depth, value, flag, best_move)
+        return value
+
+    def _make_move(self, board, move, key):
+        """在棋盘上直接落子并交换执子方，返回落子后的哈希值"""
+        player = board.current_player
+        self._play_move(board, move)
+        return zobrist_update(key, move, player, board.size)
+
+    def _order_moves(self, moves, tt_move, depth):
+        """置换表中的最佳移动最先，其次是杀手移动，其余保持评估排序"""
+        first = [tt_move] if tt_move in moves else []
+        for killer in self.killers.get(depth, []):
+            if killer in moves and killer not in first:
+                first.append(killer)
+        return first + [move for move in moves if move not in first]
+
+    def _principal_variation(self, board, key, depth):
+        """沿置换表中的最佳移动从根节点还原主要变例"""
+        pv = []
+        player = board.current_player
+        while len(pv) < depth:
+            entry = self.tt.get(key & TT_MASK)
+            if entry is None or entry[0] != key or entry[4] is None:
+                break
+            pv.append(entry[4])
+            key = zobrist_update(key, entry[4], player, board.size)
+            player = -player
+        return pv
+
+    def _evaluate_board(self, board):
+        """按_line_scores的规则累计双方所有棋子在四个方向上的棋型分数"""
+        board_array = np.asarray(board.board)
+        stones = [(i, j, board_array[i, j] == self.root_player)
+                  for i, j in np.argwhere(board_array != 0).tolist()]
+        score = 0
+        for direction in DIRECTIONS:
+            get_line = LINE_GETTERS[direction]
+            for i, j, mine in stones:
+                line, k = get_line(board_array, i, j)
+                if mine:
+                    score += _line_scores(line)[self.root_player][k]
+                else:
+                    score -= _line_scores(line)[-self.root_player][k] * 1.1  # 略微提高防守权重
         return score
 
     def get_best_move(self, board):
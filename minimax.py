@@ -1,10 +1,194 @@
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 from board import Board
+from search_common import (TT_MASK, EXACT, LOWER, UPPER, SearchTables, njit,
+                           zobrist_hash, zobrist_update)
 
-class GomokuAI:
-    def __init__(self, max_depth=4):
+DIRECTIONS = ((1, 0), (0, 1), (1, 1), (1, -1))
+
+# 候选移动缓存的容量
+MOVE_CACHE_SIZE = 1 << 16
+
+# 静态搜索沿强制着法继续搜索的最大步数，以及每个节点最多尝试的强制着法数
+QUIESCE_DEPTH = 2
+QUIESCE_WIDTH = 4
+
+# 渴望窗口的半宽：以上一轮的分数为中心搜索，约为半个活三的分数
+ASPIRATION_WINDOW = 500
+
+# 整盘评估时沿每个方向的两侧各取RAY_LENGTH格，棋盘四周用EDGE填充（既不是空位也不是任何一方的棋子）
+RAY_LENGTH = 7
+EDGE = 2
+_RAY_STEPS = np.arange(1, RAY_LENGTH + 1)
+# RAY_DI/RAY_DJ[方向*2+侧, 步数-1]为相对偏移，每个方向先反向后正向
+RAY_DI = np.array([sign * di * _RAY_STEPS for di, dj in DIRECTIONS for sign in (-1, 1)])
+RAY_DJ = np.array([sign * dj * _RAY_STEPS for di, dj in DIRECTIONS for sign in (-1, 1)])
+RAY_INDEX = np.arange(RAY_DI.shape[0])
+# 按棋盘大小缓存的射线下标：填充后的行宽、RAY_DI/RAY_DJ换算成的一维偏移、填充后的空棋盘
+_ray_tables = {}
+
+
+def _ray_table(size):
+    """取出(或首次构建)size×size棋盘对应的射线下标表，同一大小只计算一次"""
+    table = _ray_tables.get(size)
+    if table is None:
+        width = size + 2 * RAY_LENGTH
+        padded = np.full((width, width), EDGE, dtype=np.int8)
+        padded[RAY_LENGTH:-RAY_LENGTH, RAY_LENGTH:-RAY_LENGTH] = 0
+        table = _ray_tables[size] = (width, RAY_DI * width + RAY_DJ, padded)
+    return table
+
+# 以下为搜索中的热点循环，安装了numba时编译为机器码
+@njit(cache=True, boundscheck=False)
+def _is_winning_move_nb(board_array, i, j, player):
+    """把(i, j)视为player的棋子时，是否有某个方向连成五子（不修改棋盘）"""
+    size = board_array.shape[0]
+    for di, dj in DIRECTIONS:
+        count = 1
+        for step in (1, -1):
+            ni, nj = i + step * di, j + step * dj
+            while 0 <= ni < size and 0 <= nj < size and board_array[ni, nj] == player:
+                count += 1
+                ni += step * di
+                nj += step * dj
+        if count >= 5:
+            return True
+    return False
+
+@njit(cache=True, boundscheck=False)
+def _get_pattern_nb(board_array, i, j, di, dj, player):
+    """获取某个方向的棋型：(连子数, 被堵端数, 两侧空位数)"""
+    size = board_array.shape[0]
+    consecutive = 1
+    blocked = 0
+    spaces = 0
+    # 先向前(反方向)再向后检查
+    for step in (-1, 1):
+        space = 0
+        ni, nj = i + step * di, j + step * dj
+        while 0 <= ni < size and 0 <= nj < size:
+            if board_array[ni, nj] == 0:
+                space += 1
+                if space >= 2:
+                    break
+            elif board_array[ni, nj] == player:
+                if space == 0:
+                    consecutive += 1
+                else:
+                    break
+            else:
+                blocked += 1
+                break
+            ni += step * di
+            nj += step * dj
+        spaces += space
+    return consecutive, blocked, spaces
+
+@njit(cache=True, boundscheck=False)
+def _line_totals_nb(board_array, i, j, pattern_table):
+    """经过(i, j)的四条线上，每个棋子沿该线方向的棋型分之和：[黑方, 白方]"""
+    size = board_array.shape[0]
+    totals = np.zeros(2, dtype=np.int64)
+    for di, dj in DIRECTIONS:
+        # 退到这条线的起点，再逐格向前
+        ni, nj = i, j
+        while 0 <= ni - di < size and 0 <= nj - dj < size:
+            ni -= di
+            nj -= dj
+        while 0 <= ni < size and 0 <= nj < size:
+            color = board_array[ni, nj]
+            if color != 0:
+                consecutive, blocked, _ = _get_pattern_nb(board_array, ni, nj, di, dj, color)
+                totals[0 if color == 1 else 1] += pattern_table[min(consecutive, 5), blocked]
+            ni += di
+            nj += dj
+    return totals
+
+@njit(cache=True, boundscheck=False)
+def _line_threats_nb(board_array, i, j, player, pattern_table, threshold, out):
+    """经过(i, j)的四条线上距离4以内的空位中，player落子后沿该线形成分数不低于threshold的棋型的位置，在out中标记"""
+    size = board_array.shape[0]
+    for di, dj in DIRECTIONS:
+        for step in range(-4, 5):
+            ni, nj = i + step * di, j + step * dj
+            if step != 0 and 0 <= ni < size and 0 <= nj < size and board_array[ni, nj] == 0:
+                consecutive, blocked, _ = _get_pattern_nb(board_array, ni, nj, di, dj, player)
+                if pattern_table[min(consecutive, 5), blocked] >= threshold:
+                    out[ni, nj] = True
+
+@njit(cache=True, boundscheck=False)
+def _evaluate_direction_all_nb(board_array, i, j, player, pattern_table):
+    """评估某个位置所有方向的价值"""
+    score = 0
+    for di, dj in DIRECTIONS:
+        consecutive, blocked, _ = _get_pattern_nb(board_array, i, j, di, dj, player)
+        score += pattern_table[min(consecutive, 5), blocked]
+    return score
+
+@njit(cache=True, boundscheck=False)
+def _evaluate_move_nb(board_array, i, j, player, pattern_table):
+    """评估某个位置的价值。棋型只看(i,j)两侧的格子，无需真的落子"""
+    score = 0.0
+    # 评估进攻价值，评估防守价值（略微提高防守权重）
+    score += _evaluate_direction_all_nb(board_array, i, j, player, pattern_table)
+    score += _evaluate_direction_all_nb(board_array, i, j, -player, pattern_table) * 1.1
+    # 考虑位置的中心性
+    center = board_array.shape[0] // 2
+    score -= (abs(i - center) + abs(j - center)) * 10
+    return score
+
+@njit(cache=True, boundscheck=False)
+def _move_scores_nb(board_array, rows, cols, player, pattern_table):
+    """返回各候选位置(rows[k], cols[k])的评估分数"""
+    scores = np.empty(len(rows))
+    for k in range(len(rows)):
+        scores[k] = _evaluate_move_nb(board_array, rows[k], cols[k], player, pattern_table)
+    return scores
+
+def _neighbor_counts(board_array):
+    """每个位置周围3x3范围内（含自身）的棋子数"""
+    size = board_array.shape[0]
+    padded = np.zeros((size + 2, size + 2), dtype=np.int8)
+    padded[1:-1, 1:-1] = board_array != 0
+    counts = np.zeros((size, size), dtype=np.int8)
+    for di in range(3):
+        for dj in range(3):
+            counts += padded[di:di + size, dj:dj + size]
+    return counts
+
+def _winning_cells(board_array, player):
+    """布尔数组：在该空位落子能让player连成五子的位置。
+    沿每个方向检查以每个位置为中心、长为5的窗口，窗口内恰有4个player的棋子和1个空位时，这个空位即为成五点"""
+    size = board_array.shape[0]
+    mine = np.zeros((size + 4, size + 4), dtype=np.int8)
+    mine[2:-2, 2:-2] = board_array == player
+    empty = np.zeros((size + 4, size + 4), dtype=np.int8)
+    empty[2:-2, 2:-2] = board_array == 0
+    wins = np.zeros((size + 4, size + 4), dtype=bool)
+    for di, dj in DIRECTIONS:
+        # 窗口中第k格相对中心的偏移为(k*di, k*dj)
+        cells = [(slice(2 + k * di, 2 + k * di + size), slice(2 + k * dj, 2 + k * dj + size))
+                 for k in range(-2, 3)]
+        four = (sum(mine[cell] for cell in cells) == 4) & (sum(empty[cell] for cell in cells) == 1)
+        for cell in cells:
+            wins[cell] |= four & (empty[cell] == 1)
+    return wins[2:-2, 2:-2]
+
+class GomokuAI(SearchTables):
+    def __init__(self, max_depth=4, workers=1):
         self.max_depth = max_depth
+        self.workers = workers  # 根节点并行搜索的进程数，1表示在当前进程中顺序搜索
+        self.executor = None  # workers > 1时首次搜索才创建的进程池，之后一直复用
         self.best_move = None
+        self.tt = {}  # 置换表：槽位 -> (哈希, 深度, 分数, 类型, 最佳移动)
+        self.killers = {}  # 剩余深度 -> 最近两个引起剪枝的移动
+        self.history = None  # 历史表：[执子方, 行, 列] -> 引起剪枝的累计权重
+        self.pattern_totals = None  # 搜索中棋盘上双方的棋型分之和：[黑方, 白方]，随落子增量更新
+        self.total_deltas = []  # 每步落子引起的棋型分变化，撤销时使用
+        self.played = []  # 搜索中已落下、尚未撤销的移动
+        self.neighbor_counts = None  # 搜索中每个位置周围3x3范围内的棋子数，随落子增量更新
+        self.move_cache = OrderedDict()  # (哈希, 执子方) -> 排序后的候选移动，按最近使用淘汰
         
         # 棋型分数
         self.pattern_scores = {
@@ -17,6 +201,25 @@ class GomokuAI:
             'sleep2': 50,      # 眠二
             'alive1': 10,      # 活一
         }
+        # 棋型分数表：pattern_table[min(连子数, 5), 被堵端数]，两端都被堵的棋型不得分
+        self.pattern_table = np.zeros((6, 3), dtype=np.int64)
+        self.pattern_table[5, :] = self.pattern_scores['win5']
+        self.pattern_table[4, :2] = self.pattern_scores['alive4'], self.pattern_scores['rush4']
+        self.pattern_table[3, :2] = self.pattern_scores['alive3'], self.pattern_scores['sleep3']
+        self.pattern_table[2, :2] = self.pattern_scores['alive2'], self.pattern_scores['sleep2']
+        self.pattern_table[1, 0] = self.pattern_scores['alive1']
+
+    def close(self):
+        """关闭并行搜索的进程池（如已创建），之后再搜索时会重新创建"""
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
 
     def get_move(self, board):
         """获取最佳移动"""
@@ -29,253 +232,331 @@ class GomokuAI:
             center = board.size // 2
             return (center, center)
             
-        # 检查必胜着法
-        for move in valid_moves:
-            if self._is_winning_move(board, move, board.current_player):
-                return move
-                
-        # 检查必防着法
-        for move in valid_moves:
-            if self._is_winning_move(board, move, -board.current_player):
-                return move
+        # 检查必胜着法，再检查必防着法：整盘一次算出所有成五点，不局限于候选移动
+        board_array = np.asarray(board.board)
+        for player in (board.current_player, -board.current_player):
+            wins = _winning_cells(board_array, player)
+            if wins.any():
+                return tuple(int(x) for x in np.argwhere(wins)[0])
+        
+        board, key = self._prepare_search(board)
+        best_move = None
+        
+        # 迭代加深：上一轮的最佳移动在下一轮最先搜索，
+        # 置换表中各节点的最佳移动同样会被优先搜索。
+        # 叶节点以当时执子方的视角评估，只有与max_depth奇偶相同的深度结果可比
+        # 从第二轮起以上一轮的分数为中心用窄窗口搜索，结果落在窗口外时放宽该侧重新搜索。
+        # 并行搜索总是以完整窗口搜索每个移动，窄窗口对它没有意义
+        score = None
+        for depth in range(2 - self.max_depth % 2, self.max_depth + 1, 2):
+            if score is None or self.workers > 1:
+                alpha, beta = float('-inf'), float('inf')
+            else:
+                alpha, beta = score - ASPIRATION_WINDOW, score + ASPIRATION_WINDOW
+            while True:
+                move, score = self._search_root(board, valid_moves, depth, key, best_move, alpha, beta)
+                if score <= alpha and alpha > float('-inf'):
+                    alpha = float('-inf')
+                elif score >= beta and beta < float('inf'):
+                    beta = float('inf')
+                else:
+                    break
+            best_move = move
+            
+        return best_move
+
+    def _prepare_search(self, board):
+        """为一次搜索重置各张表，返回搜索专用的棋盘副本及其哈希值"""
+        # 是否为极大层取决于根节点的执子方，每次搜索重新建表
+        self.tt = {}
+        self.killers = {}
+        self.history = np.zeros((2, board.size, board.size), dtype=np.int64)
+        self.pattern_totals = self._pattern_totals(board)
+        self.total_deltas = []
+        self.played = []
+        self.neighbor_counts = _neighbor_counts(np.asarray(board.board))
+        key = zobrist_hash(board)
+        # 整个搜索在同一份棋盘上落子/撤销，不影响调用方的棋盘。
+        # 搜索用的棋盘统一存成int8数组：每格1字节，传给numba内核时也不必再转换
+        board = board.copy()
+        board.board = np.array(board.board, dtype=np.int8)
+        return board, key
+
+    def _search_root(self, board, valid_moves, depth, key, pv_move=None,
+                     alpha=float('-inf'), beta=float('inf')):
+        """在根节点上以(alpha, beta)窗口搜索指定深度，返回(最佳移动, 分数)"""
+        if pv_move is not None:
+            valid_moves = [pv_move] + [move for move in valid_moves if move != pv_move]
+        if self.workers > 1:
+            return self._search_root_parallel(board, valid_moves, depth)
         
-        alpha = float('-inf')
-        beta = float('inf')
         best_score = float('-inf')
         best_move = None
         
         # 对每个可能的移动进行评估
         for move in valid_moves:
-            new_board = board.copy()
-            new_board.make_move(move)
-            score = self._minimax(new_board, self.max_depth-1, False, alpha, beta)
+            score = self._search_child(board, move, depth-1, False, alpha, beta, key)
             
             if score > best_score:
                 best_score = score
                 best_move = move
             
             alpha = max(alpha, best_score)
+            if alpha >= beta:
+                break
             
-        return best_move
+        return best_move, best_score
+
+    def _search_root_parallel(self, board, valid_moves, depth):
+        """把根节点的各个移动分给进程池搜索，返回(最佳移动, 分数)。
+        各进程之间不共享α-β窗口和置换表，每个移动都以完整窗口搜索，
+        总节点数比顺序搜索多，但各移动能同时在多个核上计算"""
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        n = len(valid_moves)
+        scores = list(self.executor.map(_search_root_move, [self.max_depth] * n, [board] * n,
+                                        valid_moves, [depth] * n))
+        # 分数相同时取排在前面的移动，与顺序搜索一致
+        best = int(np.argmax(scores))
+        return valid_moves[best], scores[best]
 
-    def _get_valid_moves(self, board):
-        """获取所有有效的移动，按照距离已有棋子的远近排序"""
-        if len(board.get_valid_moves()) == board.size * board.size:
+    def _get_valid_moves(self, board, neighbor_counts=None):
+        """获取所有有效的移动，按照距离已有棋子的远近排序。
+        neighbor_counts为搜索中增量维护的邻居计数，未提供时现算"""
+        board_array = np.asarray(board.board)
+        if not board_array.any():
             center = board.size // 2
             return [(center, center)]
-            
-        moves = []
-        for i in range(board.size):
-            for j in range(board.size):
-                if board.board[i][j] == 0 and self._has_neighbor(board, i, j):
-                    score = self._evaluate_move(board, (i, j))
-                    moves.append((score, (i, j)))
         
-        # 按评分降序排序，只返回前15个最佳移动
-        moves.sort(reverse=True)
-        return [move for _, move in moves[:15]]
-
-    def _has_neighbor(self, board, i, j):
-        """检查位置(i,j)周围是否有棋子"""
-        for di in [-1, 0, 1]:
-            for dj in [-1, 0, 1]:
-                if di == 0 and dj == 0:
-                    continue
-                ni, nj = i + di, j + dj
-                if 0 <= ni < board.size and 0 <= nj < board.size:
-                    if board.board[ni][nj] != 0:
-                        return True
-        return False
-
-    def _minimax(self, board, depth, is_maximizing, alpha, beta):
-        """极大极小搜索算法"""
-        if depth == 0 or board.is_game_over():
-            return self._evaluate_board(board)
+        # 只考虑周围有棋子的空位
+        if neighbor_counts is None:
+            neighbor_counts = _neighbor_counts(board_array)
+        rows, cols = np.nonzero((board_array == 0) & (neighbor_counts > 0))
+        scores = _move_scores_nb(board_array, rows, cols, board.current_player, self.pattern_table)
         
-        valid_moves = self._get_valid_moves(board)
+        # 按评分降序，只返回前15个最佳移动；候选按位置升序排列，
+        # 以下标为次关键字，同分时位置靠后的在前
+        top = np.lexsort((np.arange(len(scores)), scores))[:-16:-1]
+        return list(zip(rows[top].tolist(), cols[top].tolist()))
+
+    def _cached_valid_moves(self, board, key):
+        """搜索中的_get_valid_moves，结果只取决于局面，按Zobrist哈希缓存（调用方不得修改返回的列表）"""
+        cache_key = (key, board.current_player)
+        moves = self.move_cache.get(cache_key)
+        if moves is None:
+            moves = self._get_valid_moves(board, self.neighbor_counts)
+            self.move_cache[cache_key] = moves
+            if len(self.move_cache) > MOVE_CACHE_SIZE:
+                self.move_cache.popitem(last=False)
+        else:
+            self.move_cache.move_to_end(cache_key)
+        return moves
+
+    def _minimax(self, board, depth, is_maximizing, alpha, beta, key):
+        """极大极小搜索算法，key为board的Zobrist哈希值"""
+        # 查询置换表
+        alpha_orig, beta_orig = alpha, beta
+        tt_move = None
+        entry = self.tt.get(key & TT_MASK)
+        if entry is not None and entry[0] == key:
+            tt_move = entry[4]
+            # 叶节点以当时执子方的视角评估，深度奇偶不同的分数不能混用
+            if entry[1] >= depth and (entry[1] - depth) % 2 == 0:
+                _, _, score, flag, _ = entry
+                if flag == EXACT:
+                    return score
+                if flag == LOWER:
+                    alpha = max(alpha, score)
+                else:
+                    beta = min(beta, score)
+                if alpha >= beta:
+                    return score
+        
+        if depth == 0:
+            # 叶节点以当时执子方的视角评估，沿强制着法继续搜索以免遗漏冲四、活三等威胁
+            # 静态搜索的强制着法取决于最近两步落子而不只是局面，结果不写入只以局面为键的置换表
+            return self._quiesce(board, alpha, beta, is_maximizing, key, board.current_player)
+        
+        valid_moves = self._order_moves(board, self._cached_valid_moves(board, key), tt_move, depth)
+        if not valid_moves:  # 棋盘已满，和棋
+            return self._score_totals(self.pattern_totals, board.current_player)
+        best_move = None
         
         if is_maximizing:
-            max_eval = float('-inf')
+            value = float('-inf')
             for move in valid_moves:
-                new_board = board.copy()
-                new_board.make_move(move)
-                eval = self._minimax(new_board, depth-1, False, alpha, beta)
-                max_eval = max(max_eval, eval)
+                eval = self._search_child(board, move, depth-1, False, alpha, beta, key)
+                if eval > value:
+                    value = eval
+                    best_move = move
                 alpha = max(alpha, eval)
                 if beta <= alpha:
+                    self._record_cutoff(board, move, depth)
                     break
-            return max_eval
         else:
-            min_eval = float('inf')
+            value = float('inf')
             for move in valid_moves:
-                new_board = board.copy()
-                new_board.make_move(move)
-                eval = self._minimax(new_board, depth-1, True, alpha, beta)
-                min_eval = min(min_eval, eval)
+                eval = self._search_child(board, move, depth-1, True, alpha, beta, key)
+                if eval < value:
+                    value = eval
+                    best_move = move
                 beta = min(beta, eval)
                 if beta <= alpha:
+                    self._record_cutoff(board, move, depth)
                     break
-            return min_eval
+        
+        self._store(key, depth, value, self._bound_flag(value, alpha_orig, beta_orig), best_move)
+        return value
 
-    def _is_winning_move(self, board, move, player):
-        """检查是否是必胜着法"""
-        test_board = board.copy()
-        test_board.board[move[0]][move[1]] = player
+    def _bound_flag(self, value, alpha_orig, beta_orig):
+        """按原始窗口确定置换表中的分数类型"""
+        if value <= alpha_orig:
+            return UPPER
+        if value >= beta_orig:
+            return LOWER
+        return EXACT
+
+    def _quiesce(self, board, alpha, beta, is_maximizing, key, perspective, depth_limit=QUIESCE_DEPTH):
+        """静态搜索：只沿形成或挡住活三、冲四、活四的着法继续搜索，直到局面平静。
+        分数始终以perspective的视角计算，执子方也可以不走强制着法而保持当前局面分"""
+        value = self._score_totals(self.pattern_totals, perspective)
+        if depth_limit == 0:
+            return value
+        if is_maximizing:
+            alpha = max(alpha, value)
+        else:
+            beta = min(beta, value)
+        if beta <= alpha:
+            return value
         
-        directions = [(1,0), (0,1), (1,1), (1,-1)]
-        for di, dj in directions:
-            count = 1
-            # 正向检查
-            ni, nj = move[0] + di, move[1] + dj
-            while 0 <= ni < board.size and 0 <= nj < board.size and test_board.board[ni][nj] == player:
-                count += 1
-                ni += di
-                nj += dj
-            
-            # 反向检查
-            ni, nj = move[0] - di, move[1] - dj
-            while 0 <= ni < board.size and 0 <= nj < board.size and test_board.board[ni][nj] == player:
-                count += 1
-                ni -= di
-                nj -= dj
-            
-            if count >= 5:
-                return True
-        return False
+        for move in self._forcing_moves(board):
+            wins = self._is_winning_move(board, move, board.current_player)
+            child_key = self._make_move(board, move, key)
+            if wins:
+                eval = self._score_totals(self.pattern_totals, perspective)
+            else:
+                eval = self._quiesce(board, alpha, beta, not is_maximizing, child_key,
+                                     perspective, depth_limit - 1)
+            self._undo_move(board, move)
+            if is_maximizing:
+                value = max(value, eval)
+                alpha = max(alpha, eval)
+            else:
+                value = min(value, eval)
+                beta = min(beta, eval)
+            if beta <= alpha:
+                break
+        return value
 
-    def _evaluate_board(self, board):
-        """评估整个棋盘状态"""
-        score = 0
+    def _forcing_moves(self, board):
+        """强制着法：己方形成活三及以上的棋型，或挡住对手将形成的活四、连五。
+        新的威胁只会出现在最近落下的棋子所在的线上：挡点只在对手上一步的四条线上找，
+        进攻点只在己方上一步的四条线上找，按落子评分取前QUIESCE_WIDTH个"""
+        board_array = np.asarray(board.board)
         player = board.current_player
-        opponent = -player
-        
-        # 评估所有方向
-        directions = [(1,0), (0,1), (1,1), (1,-1)]
-        for i in range(board.size):
-            for j in range(board.size):
-                if board.board[i][j] != 0:
-                    for di, dj in directions:
-                        # 评估当前玩家的棋型
-                        if board.board[i][j] == player:
-                            pattern = self._get_pattern(board, i, j, di, dj, player)
-                            score += self._get_pattern_score(pattern)
-                        # 评估对手的棋型
-                        else:
-                            pattern = self._get_pattern(board, i, j, di, dj, opponent)
-                            score -= self._get_pattern_score(pattern) * 1.1  # 略微提高防守权重
-        
+        threats = np.zeros(board_array.shape, dtype=np.bool_)
+        if self.played:
+            i, j = self.played[-1]
+            _line_threats_nb(board_array, i, j, -player, self.pattern_table,
+                             self.pattern_scores['alive4'], threats)
+        if len(self.played) >= 2:
+            i, j = self.played[-2]
+            _line_threats_nb(board_array, i, j, player, self.pattern_table,
+                             self.pattern_scores['alive3'], threats)
+        rows, cols = np.nonzero(threats)
+        if len(rows) > 1:
+            scores = _move_scores_nb(board_array, rows, cols, player, self.pattern_table)
+            top = np.argsort(-scores, kind='stable')[:QUIESCE_WIDTH]
+            rows, cols = rows[top], cols[top]
+        return list(zip(rows.tolist(), cols.tolist()))
+
+    def _search_child(self, board, move, depth, is_maximizing, alpha, beta, key):
+        """落子后搜索子节点并撤销。对局只可能因刚落下的一子连成五子而结束，
+        此时直接评估，无需每个节点都检查整个棋盘"""
+        wins = self._is_winning_move(board, move, board.current_player)
+        child_key = self._make_move(board, move, key)
+        if wins:
+            score = self._score_totals(self.pattern_totals, board.current_player)
+        else:
+            score = self._minimax(board, depth, is_maximizing, alpha, beta, child_key)
+        self._undo_move(board, move)
         return score
 
-    def _evaluate_move(self, board, move):
-        """评估某个位置的价值"""
-        score = 0
-        i, j = move
+    def _order_moves(self, board, moves, tt_move, depth):
+        """较浅搜索中的最佳移动最先，其次是杀手移动，其余按历史表排序，同分保持评估排序"""
+        first = [tt_move] if tt_move in moves else []
+        for killer in self.killers.get(depth, []):
+            if killer in moves and killer not in first:
+                first.append(killer)
+        history = self.history[0 if board.current_player == 1 else 1]
+        rest = sorted((move for move in moves if move not in first),
+                      key=lambda move: -history[move])
+        return first + rest
+
+    def _record_cutoff(self, board, move, depth):
+        """记录引起剪枝的移动：该深度的杀手移动保留两个，历史表按深度平方加权"""
+        self._add_killer(move, depth)
+        self.history[0 if board.current_player == 1 else 1][move] += depth * depth
+
+    def _make_move(self, board, move, key):
+        """在棋盘上直接落子并交换执子方，返回落子后的哈希值。
+        落子只影响经过该点的四条线上的棋型，只重算这四条线来更新双方棋型分"""
         player = board.current_player
-        opponent = -player
-        
-        # 模拟落子
-        test_board = board.copy()
-        test_board.board[i][j] = player
-        
-        # 评估进攻价值
-        attack_score = self._evaluate_direction_all(test_board, i, j, player)
-        score += attack_score
-        
-        # 评估防守价值
-        test_board.board[i][j] = opponent
-        defense_score = self._evaluate_direction_all(test_board, i, j, opponent)
-        score += defense_score * 1.1  # 略微提高防守权重
-        
-        # 考虑位置的中心性
-        center = board.size // 2
-        distance_to_center = abs(i - center) + abs(j - center)
-        score -= distance_to_center * 10
-        
-        return score
+        before = _line_totals_nb(np.asarray(board.board), move[0], move[1], self.pattern_table)
+        board.board[move] = player
+        board.current_player = -player
+        delta = _line_totals_nb(np.asarray(board.board), move[0], move[1], self.pattern_table) - before
+        self.pattern_totals = self.pattern_totals + delta
+        self.total_deltas.append(delta)
+        self.played.append(move)
+        self.neighbor_counts[max(0, move[0]-1):move[0]+2, max(0, move[1]-1):move[1]+2] += 1
+        return zobrist_update(key, move, player, board.size)
 
-    def _evaluate_direction_all(self, board, i, j, player):
-        """评估某个位置所有方向的价值"""
-        score = 0
-        directions = [(1,0), (0,1), (1,1), (1,-1)]
-        
-        for di, dj in directions:
-            pattern = self._get_pattern(board, i, j, di, dj, player)
-            score += self._get_pattern_score(pattern)
-        
-        return score
+    def _undo_move(self, board, move):
+        """撤销_make_move的落子"""
+        board.board[move] = 0
+        board.current_player = -board.current_player
+        self.pattern_totals = self.pattern_totals - self.total_deltas.pop()
+        self.played.pop()
+        self.neighbor_counts[max(0, move[0]-1):move[0]+2, max(0, move[1]-1):move[1]+2] -= 1
 
-    def _get_pattern(self, board, i, j, di, dj, player):
-        """获取某个方向的棋型"""
-        consecutive = 1
-        space_before = 0
-        space_after = 0
-        blocked = 0
-        
-        # 向前检查
-        ni, nj = i - di, j - dj
-        while 0 <= ni < board.size and 0 <= nj < board.size:
-            if board.board[ni][nj] == 0:
-                space_before += 1
-                if space_before >= 2:
-                    break
-            elif board.board[ni][nj] == player:
-                if space_before == 0:
-                    consecutive += 1
-                else:
-                    break
-            else:
-                blocked += 1
-                break
-            ni -= di
-            nj -= dj
-        
-        # 向后检查
-        ni, nj = i + di, j + dj
-        while 0 <= ni < board.size and 0 <= nj < board.size:
-            if board.board[ni][nj] == 0:
-                space_after += 1
-                if space_after >= 2:
-                    break
-            elif board.board[ni][nj] == player:
-                if space_after == 0:
-                    consecutive += 1
-                else:
-                    break
-            else:
-                blocked += 1
-                break
-            ni += di
-            nj += dj
-        
-        return (consecutive, blocked, space_before + space_after)
+    def _is_winning_move(self, board, move, player):
+        """检查是否是必胜着法"""
+        return _is_winning_move_nb(np.asarray(board.board), move[0], move[1], player)
 
-    def _get_pattern_score(self, pattern):
-        """根据棋型返回分数"""
-        consecutive, blocked, space = pattern
-        
-        if consecutive >= 5:
-            return self.pattern_scores['win5']
-        
-        if consecutive == 4:
-            if blocked == 0:
-                return self.pattern_scores['alive4']
-            elif blocked == 1:
-                return self.pattern_scores['rush4']
-        
-        if consecutive == 3:
-            if blocked == 0:
-                return self.pattern_scores['alive3']
-            elif blocked == 1:
-                return self.pattern_scores['sleep3']
-        
-        if consecutive == 2:
-            if blocked == 0:
-                return self.pattern_scores['alive2']
-            elif blocked == 1:
-                return self.pattern_scores['sleep2']
+    def _score_totals(self, totals, player):
+        """由双方棋型分计算player视角的局面分：己方的棋型加分，对手的棋型减分（略微提高防守权重）"""
+        mine = 0 if player == 1 else 1
+        return totals[mine] - totals[1 - mine] * 1.1
+
+    def _pattern_totals(self, board):
+        """对每个棋子在四个方向上按_get_pattern_nb的规则一次性计算棋型，返回双方棋型分之和：[黑方, 白方]"""
+        board_array = np.asarray(board.board)
+        width, offsets, empty = _ray_table(board.size)
+        padded = empty.copy()
+        padded[RAY_LENGTH:-RAY_LENGTH, RAY_LENGTH:-RAY_LENGTH] = board_array
+        rows, cols = np.nonzero(board_array)
+        colors = board_array[rows, cols]
         
-        if consecutive == 1:
-            if blocked == 0:
-                return self.pattern_scores['alive1']
+        # cells[棋子, 方向*2+侧, 步数-1]：每个棋子两侧的格子
+        centers = (rows + RAY_LENGTH) * width + cols + RAY_LENGTH
+        cells = padded.ravel()[centers[:, None, None] + offsets]
+        # 紧邻的连子数（最多看5格，再长也已是连五），连子之后的一到两格是否被对手堵住
+        run = (cells[:, :, :5] == colors[:, None, None]).cumprod(axis=2).sum(axis=2)
+        stones = np.arange(len(colors))[:, None]
+        after = cells[stones, RAY_INDEX, run]
+        beyond = cells[stones, RAY_INDEX, run + 1]
+        opponent = -colors[:, None]
+        blocked = (after == opponent) | ((after == 0) & (beyond == opponent))
         
-        return 0
+        consecutive = 1 + run[:, 0::2] + run[:, 1::2]
+        blocked = blocked[:, 0::2].astype(np.int64) + blocked[:, 1::2]
+        scores = self.pattern_table[np.minimum(consecutive, 5), blocked].sum(axis=1)
+        return np.array([scores[colors == 1].sum(), scores[colors == -1].sum()])
+
+
+def _search_root_move(max_depth, board, move, depth):
+    """进程池中执行：以完整窗口搜索根节点的一个移动，返回其分数"""
+    ai = GomokuAI(max_depth)
+    board, key = ai._prepare_search(board)
+    return ai._search_child(board, move, depth - 1, False, float('-inf'), float('inf'), key)
@@ -0,0 +1,66 @@
+import os
+import sys
+import numpy as np
+
+try:
+    from numba import njit as _numba_njit
+except ImportError:  # 未安装numba时以普通Python函数运行
+    def njit(*args, **kwargs):
+        def decorator(func):
+            return func
+        return decorator
+else:
+    def njit(*args, **kwargs):
+        """numba只能把编译结果缓存在源文件旁边：打包成exe或被装饰函数所在模块只有.pyc时没有源文件，此时不缓存"""
+        def decorator(func):
+            path = getattr(sys.modules.get(func.__module__), '__file__', None) or ''
+            options = dict(kwargs)
+            if getattr(sys, 'frozen', False) or not (path.endswith('.py') and os.path.exists(path)):
+                options.pop('cache', None)
+            return _numba_njit(*args, **options)(func)
+        return decorator
+
+# Zobrist哈希：每个位置、每种颜色一个随机数，按棋盘大小分别生成并缓存
+_zobrist_tables = {}
+
+# 置换表大小与分数类型
+TT_SIZE = 1 << 20
+TT_MASK = TT_SIZE - 1
+EXACT, LOWER, UPPER = 0, 1, 2
+
+def _zobrist_table(size):
+    """取出(或首次生成)size×size棋盘的Zobrist随机数表，同一大小只生成一次"""
+    table = _zobrist_tables.get(size)
+    if table is None:
+        table = _zobrist_tables[size] = np.random.default_rng(0).integers(
+            0, 2**63, size=(size, size, 2), dtype=np.uint64)
+    return table
+
+def zobrist_hash(board):
+    """计算整个棋盘的Zobrist哈希值"""
+    board_array = np.asarray(board.board)
+    table = _zobrist_table(board.size)
+    keys = np.concatenate([table[:, :, 0][board_array == 1],
+                           table[:, :, 1][board_array == -1]])
+    return int(np.bitwise_xor.reduce(keys))
+
+def zobrist_update(key, move, player, size):
+    """在size×size棋盘的哈希值中加入(或移除)player在move处的棋子"""
+    return key ^ int(_zobrist_table(size)[move[0], move[1], 0 if player == 1 else 1])
+
+class SearchTables:
+    """置换表与杀手移动表的读写，子类负责创建self.tt和self.killers"""
+
+    def _store(self, key, depth, score, flag, move):
+        """写入置换表，槽位已有更深的结果时保留原结果"""
+        index = key & TT_MASK
+        entry = self.tt.get(index)
+        if entry is None or entry[1] <= depth:
+            self.tt[index] = (key, depth, score, flag, move)
+
+    def _add_killer(self, move, depth):
+        """记录在该深度引起剪枝的移动，每层保留两个"""
+        killers = self.killers.setdefault(depth, [])
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[2:]